@@ -0,0 +1,684 @@
+"""Benchmarks for TurtleIDE's editor hot paths.
+
+Usage:
+    python bench.py              # run every benchmark
+    python bench.py highlight    # run only the named benchmarks
+    python bench.py --save-baseline       # store the results as the baseline
+    python bench.py --baseline=FILE       # compare against another baseline
+    python bench.py --tolerance=0.25      # slowdown that counts as a regression
+    python bench.py editor --sizes=1000,10000   # file sizes for the editor suite
+
+Results are compared with bench-baseline.json, when it exists, and
+regressions make the run exit with status 1. The editor suite needs a
+display; on a headless Linux box run it under xvfb-run.
+"""
+
+import gc
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import tkinter as tk
+
+import main as ide
+
+BENCHMARKS = {}
+RESULTS = {}  # Measurement key -> (value, unit), for baselines
+OPTIONS = {'baseline': os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench-baseline.json"),
+           'tolerance': 0.25, 'sizes': (1_000, 10_000, 100_000, 1_000_000)}
+
+
+def benchmark(name):
+    # Register a benchmark function under a short name
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def generate_python_source(line_count):
+    # Build a Python module of roughly line_count lines with a mix of tokens
+    block = [
+        "def function_{n}(value, other=None):",
+        "    '''Docstring for function {n}'''",
+        "    result = value * {n} + 42  # trailing comment",
+        "    if other is not None and value in other:",
+        "        return \"string with def and class inside\"",
+        "    return result",
+        "",
+    ]
+    lines = []
+    n = 0
+    while len(lines) < line_count:
+        lines.extend(line.format(n=n) for line in block)
+        n += 1
+    return lines[:line_count]
+
+
+# A few representative lines for every language in SYNTAX_PATTERNS
+SAMPLES = {
+    '.py': generate_python_source(7),
+    '.bat': ['@echo off', 'rem build the project', 'set TARGET="release"',
+             'if exist build (call :clean) else goto end', ':: comment', ':clean', 'del /q build'],
+    '.cpp': ['#include <vector>', 'static int count_items(const char* name) {',
+             '    /* block comment with if and for */', '    return strlen("for while") + 42; // done', '}'],
+    '.cs': ['public class Widget : Base {', '    private int count = 10; // field',
+            '    public string Name() { return "class if"; }', '    /* note */ }'],
+    '.js': ['function render(items) {', '  const total = items.length + 1; // count',
+            '  return `template ${total}` + "if while";', '  /* block */ }'],
+    '.html': ['<div class="card">', '  <!-- comment with <b>tags</b> -->',
+              "  <a href='/index.html'>Home</a>", '</div>'],
+    '.css': ['@media screen {', '  .card #title { color: "red"; }',
+             '  /* comment .not-a-selector */', '  margin: 0 auto;', '}'],
+}
+SAMPLES['.cmd'] = SAMPLES['.bat']
+
+
+def generate_source(ext, line_count):
+    # line_count lines of a language, from its samples
+    if ext == '.py':
+        return generate_python_source(line_count)
+    sample = SAMPLES[ext]
+    return (sample * (line_count // len(sample) + 1))[:line_count]
+
+
+def record(key, value, unit):
+    # Keep a measurement for the baseline comparison; units ending in /s are
+    # better when higher, everything else when lower
+    RESULTS[key] = (value, unit)
+
+
+def percentiles(samples):
+    # p50, p90, p99 and max of a list of durations
+    samples = sorted(samples)
+    pick = lambda fraction: samples[min(len(samples) - 1, int(fraction * len(samples)))]
+    return pick(0.5), pick(0.9), pick(0.99), samples[-1]
+
+
+def rss_mb():
+    # Resident memory of this process, or None where it cannot be read
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def report(name, rows):
+    # Print one aligned row per measurement
+    print(f"\n{name}")
+    for label, value in rows:
+        print(f"  {label:<28}{value}")
+
+
+@benchmark("highlight")
+def bench_incremental_highlight():
+    # Per-keystroke highlight cost should stay flat as the file grows
+    lexer = ide.LineLexer(ide.SYNTAX_PATTERNS['.py'], ide.BLOCK_DELIMITERS['.py'])
+    rows = []
+    for line_count in (1_000, 10_000, 100_000):
+        lines = generate_python_source(line_count)
+        get_lines = lambda first, last: lines[first - 1:last]
+
+        highlighter = ide.IncrementalHighlighter()
+        highlighter.reset(len(lines), lexer)
+        start = time.perf_counter()
+        highlighter.rehighlight(get_lines, len(lines))
+        full = time.perf_counter() - start
+
+        # Simulate typing characters into a line in the middle of the file
+        keystrokes = 500
+        target = line_count // 2
+        start = time.perf_counter()
+        for i in range(keystrokes):
+            lines[target - 1] += "x"
+            highlighter.lines_changed(target, target, target)
+            highlighter.rehighlight(get_lines, len(lines))
+        per_key = (time.perf_counter() - start) / keystrokes
+
+        record(f"highlight/{line_count} lines full", full * 1000, 'ms')
+        record(f"highlight/{line_count} lines keystroke", per_key * 1e6, 'us')
+        rows.append((f"{line_count:>7} lines full", f"{full * 1000:9.1f} ms"))
+        rows.append((f"{line_count:>7} lines keystroke", f"{per_key * 1e6:9.1f} us"))
+    report("Incremental highlighting (.py)", rows)
+
+
+@benchmark("line-index")
+def bench_line_index():
+    # Converting match offsets in a ~1 MB file to "line.col" indices the way
+    # Find does: the matches on one screen, and the matches Find All lists
+    text = "\n".join(generate_python_source(25_000))
+    start = time.perf_counter()
+    rope = ide.LineRope(text)
+    build = time.perf_counter() - start
+
+    offsets = []
+    for match in ide.compile_search("in").finditer(text):
+        offsets.append(match.start())
+        offsets.append(match.end())
+    view_start, view_end = rope.line_start(12_500), rope.line_start(12_560)
+    visible = [offset for offset in offsets if view_start <= offset < view_end]
+    repeats = 200
+    start = time.perf_counter()
+    for i in range(repeats):
+        rope.offsets_to_indices(visible)
+    screen = (time.perf_counter() - start) / repeats
+    listed = offsets[0::2][:ide.FIND_ALL_LIMIT]
+    start = time.perf_counter()
+    rope.offsets_to_indices(listed)
+    find_all = time.perf_counter() - start
+
+    record("line-index/build", build * 1000, 'ms')
+    record("line-index/one screen", screen * 1000, 'ms')
+    record("line-index/find all", find_all * 1000, 'ms')
+    report(f"Line index ({len(text) / 1e6:.1f} MB, {len(offsets) // 2} matches)", [
+        ("build", f"{build * 1000:9.1f} ms"),
+        ("one screen", f"{screen * 1000:9.3f} ms  ({len(visible) // 2} matches)"),
+        ("find all", f"{find_all * 1000:9.1f} ms  ({len(listed)} matches)"),
+    ])
+
+
+@benchmark("rope")
+def bench_rope():
+    # Memory and latency of the rope that mirrors the buffer, by file size
+    rows = []
+    for line_count in (10_000, 100_000, 1_000_000):
+        lines = generate_python_source(line_count)
+        text = "\n".join(lines)
+        del lines
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        rope = ide.LineRope(text)
+        build = time.perf_counter() - start
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # Typing into a line, and pasting/deleting blocks of lines
+        edits = 2000
+        target = line_count // 2
+        start = time.perf_counter()
+        for i in range(edits):
+            line = rope.get_lines(target, target)[0]
+            rope.lines_changed(target, target, [line + "x"])
+        keystroke = (time.perf_counter() - start) / edits
+        start = time.perf_counter()
+        for i in range(edits // 2):
+            rope.lines_changed(target, target, ["pasted"] * 40)
+            rope.lines_changed(target, target + 39, [""])
+        block = (time.perf_counter() - start) / edits
+
+        total = rope.char_count()
+        probes = [(i * 7919) % total for i in range(edits)]
+        start = time.perf_counter()
+        for offset in probes:
+            rope.index_to_offset(rope.offset_to_index(offset))
+        lookup = (time.perf_counter() - start) / edits
+        start = time.perf_counter()
+        for i in range(edits):
+            rope.get_lines(target, target + 60)
+        viewport = (time.perf_counter() - start) / edits
+
+        start = time.perf_counter()
+        snapshot = rope.snapshot()
+        snap = time.perf_counter() - start
+        start = time.perf_counter()
+        for piece in snapshot.iter_text():
+            pass
+        stream = time.perf_counter() - start
+        start = time.perf_counter()
+        rope.text()
+        join = time.perf_counter() - start
+
+        key = f"rope/{line_count} lines"
+        record(f"{key} build", build * 1000, 'ms')
+        record(f"{key} memory", memory / len(text), 'bytes/char')
+        record(f"{key} keystroke", keystroke * 1e6, 'us')
+        record(f"{key} block edit", block * 1e6, 'us')
+        record(f"{key} offset<->index", lookup * 1e6, 'us')
+        record(f"{key} 60-line slice", viewport * 1e6, 'us')
+        record(f"{key} snapshot", snap * 1000, 'ms')
+        label = f"{line_count:>9,} lines"
+        rows.append((f"{label} build", f"{build * 1000:9.1f} ms  {memory / len(text):5.2f} bytes/char "
+                                       f"({memory / 1e6:.0f} MB for {len(text) / 1e6:.0f} MB)"))
+        rows.append((f"{label} keystroke", f"{keystroke * 1e6:9.1f} us"))
+        rows.append((f"{label} block edit", f"{block * 1e6:9.1f} us"))
+        rows.append((f"{label} offset<->index", f"{lookup * 1e6:9.1f} us"))
+        rows.append((f"{label} 60-line slice", f"{viewport * 1e6:9.1f} us"))
+        rows.append((f"{label} snapshot", f"{snap * 1000:9.2f} ms  (stream {stream * 1000:.1f} ms, "
+                                          f"join {join * 1000:.1f} ms)"))
+    report("Line rope", rows)
+
+
+@benchmark("lexer")
+def bench_combined_lexer():
+    # The combined lexer against one scan per category. Highlighting is
+    # incremental, so lines are lexed one at a time; whole-buffer scans are
+    # shown for reference only, as their overlapping spans cannot be used
+    rows = []
+    for ext, patterns in ide.SYNTAX_PATTERNS.items():
+        sample = SAMPLES[ext]
+        lines = (sample * (20_000 // len(sample) + 1))[:20_000]
+        text = "\n".join(lines)
+        regexes = [(name, re.compile(pattern)) for name, pattern in patterns.items()]
+
+        start = time.perf_counter()
+        spans = []
+        for name, regex in regexes:
+            for match in regex.finditer(text):
+                spans.append((name, match.start(), match.end()))
+        whole_buffer = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for line in lines:
+            spans = []
+            for name, regex in regexes:
+                for match in regex.finditer(line):
+                    spans.append((name, match.start(), match.end()))
+            spans.sort(key=lambda span: span[1])
+        per_line = time.perf_counter() - start
+
+        lexer = ide.LineLexer(patterns, ide.BLOCK_DELIMITERS.get(ext, ()))
+        start = time.perf_counter()
+        state = None
+        for line in lines:
+            spans, state = lexer.lex_line(line, state)
+        combined = time.perf_counter() - start
+
+        mb = len(text) / 1e6
+        record(f"lexer/{ext} combined", mb / combined, 'MB/s')
+        rows.append((f"{ext} per-category, per line", f"{mb / per_line:7.1f} MB/s"))
+        rows.append((f"{ext} combined lexer", f"{mb / combined:7.1f} MB/s"))
+        rows.append((f"{ext} per-category, whole", f"{mb / whole_buffer:7.1f} MB/s  (reference)"))
+    report("Lexer throughput (20k lines per language)", rows)
+
+
+def make_source_tree(root, packages=40, modules=50):
+    # A synthetic project plus binary and ignored files; returns the source bytes written
+    source = "\n".join(generate_python_source(400))
+    total = 0
+    for package in range(packages):
+        directory = os.path.join(root, f"package_{package}")
+        os.makedirs(os.path.join(directory, "__pycache__"))
+        for module in range(modules):
+            # A unique name per module gives rare queries something to find
+            data = f"# module_{package}_{module}\n{source}".encode('utf-8')
+            with open(os.path.join(directory, f"module_{module}.py"), 'wb') as file:
+                file.write(data)
+            total += len(data)
+        with open(os.path.join(directory, "data.bin"), 'wb') as file:
+            file.write(bytes(range(256)) * 256)
+        with open(os.path.join(directory, "__pycache__", "module_0.pyc"), 'wb') as file:
+            file.write(source.encode('utf-8'))
+    return total
+
+
+@benchmark("find-in-files")
+def bench_find_in_files():
+    # Search a synthetic project tree with different worker counts
+    with tempfile.TemporaryDirectory() as root:
+        total = make_source_tree(root)
+        rows = []
+        # A rare query measures scanning, a common one measures result building
+        for query in ("function_7", "result"):
+            regex = ide.compile_search(query, 'word')
+            for workers in (1, 4, None):
+                search = ide.FileSearch(root, regex, workers=workers)
+                start = time.perf_counter()
+                search.run()
+                elapsed = time.perf_counter() - start
+                label = f"'{query}' {search.workers} worker{'s' if search.workers > 1 else ''}"
+                record(f"find-in-files/'{query}' {workers or 'default'} workers", elapsed * 1000, 'ms')
+                rows.append((label, f"{elapsed * 1000:9.1f} ms  {total / 1e6 / elapsed:7.1f} MB/s  "
+                                    f"{search.match_count:,} matches"))
+    report(f"Find in files (2000 files, {total / 1e6:.1f} MB)", rows)
+
+
+@benchmark("trigram-index")
+def bench_trigram_index():
+    # Index build, reload and narrowed searches against a full scan
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as home:
+        total = make_source_tree(root)
+        index = ide.WorkspaceIndex(root)
+        index.cache_path = os.path.join(home, "bench.idx")
+
+        start = time.perf_counter()
+        index.scan()
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        index.save()
+        save = time.perf_counter() - start
+        reloaded = ide.WorkspaceIndex(root)
+        reloaded.cache_path = index.cache_path
+        start = time.perf_counter()
+        reloaded.load()
+        load = time.perf_counter() - start
+        start = time.perf_counter()
+        changed = reloaded.scan()
+        rescan = time.perf_counter() - start
+
+        record("trigram-index/build", build * 1000, 'ms')
+        record("trigram-index/load", load * 1000, 'ms')
+        record("trigram-index/rescan", rescan * 1000, 'ms')
+        rows = [
+            ("build", f"{build * 1000:9.1f} ms  {total / 1e6 / build:7.1f} MB/s"),
+            ("save", f"{save * 1000:9.1f} ms  {os.path.getsize(index.cache_path) / 1e6:.1f} MB on disk"),
+            ("load", f"{load * 1000:9.1f} ms"),
+            ("rescan, nothing changed", f"{rescan * 1000:9.1f} ms  changed={changed}"),
+        ]
+        for query in ("module_17_3", "function_7", "result"):
+            regex = ide.compile_search(query, 'text')
+            start = time.perf_counter()
+            candidates = index.candidates(query, 'text')
+            lookup = time.perf_counter() - start
+            search = ide.FileSearch(root, regex, candidates=lambda: candidates)
+            start = time.perf_counter()
+            search.run()
+            narrowed = time.perf_counter() - start
+            full = ide.FileSearch(root, regex)
+            start = time.perf_counter()
+            full.run()
+            scan = time.perf_counter() - start
+            record(f"trigram-index/'{query}' indexed search", (lookup + narrowed) * 1000, 'ms')
+            rows.append((f"'{query}' lookup", f"{lookup * 1000:9.2f} ms  {len(candidates):,} candidates"))
+            rows.append((f"'{query}' indexed search", f"{narrowed * 1000:9.1f} ms  {search.match_count:,} matches"))
+            rows.append((f"'{query}' full scan", f"{scan * 1000:9.1f} ms  {full.match_count:,} matches"))
+    report(f"Trigram index (2000 files, {total / 1e6:.1f} MB)", rows)
+
+
+@benchmark("quick-open")
+def bench_quick_open():
+    # Per-keystroke ranking cost of Go to File over a very large workspace
+    words = ("src lib core utils editor main test widget render parser lexer token view "
+             "model data cache index search tree file open save run task pool plugin").split()
+    extensions = ('.py', '.js', '.cpp', '.html', '.css', '.txt')
+    generator = random.Random(0)
+    paths = []
+    for i in range(500_000):
+        folders = [generator.choice(words) + (f"_{generator.randrange(100)}" if generator.random() < 0.5 else "")
+                   for level in range(generator.randint(1, 6))]
+        name = f"{generator.choice(words)}{i}{generator.choice(extensions)}"
+        paths.append("/".join(folders + [name]))
+    
+    index = ide.PathIndex(".")
+    start = time.perf_counter()
+    index.index_paths(paths)
+    build = time.perf_counter() - start
+    rows = [("index 500,000 paths", f"{build * 1000:9.1f} ms  (including character bitmaps)")]
+    # The app builds on a background thread, which also absorbs the collector's
+    # first pass over the new lists
+    gc.collect()
+    
+    # Type each query one character at a time, as the palette sees it
+    for query in ("main", "mainpy", "editorwidget", "wdgt", "src/lexer", "zzq"):
+        times = []
+        for end in range(1, len(query) + 1):
+            start = time.perf_counter()
+            results = index.match(query[:end])
+            times.append(time.perf_counter() - start)
+        record(f"quick-open/'{query}' mean", sum(times) / len(times) * 1000, 'ms')
+        record(f"quick-open/'{query}' worst", max(times) * 1000, 'ms')
+        rows.append((f"'{query}'", f"{sum(times) / len(times) * 1000:9.2f} ms/key  "
+                                   f"(worst {max(times) * 1000:.2f} ms, {len(results)} results)"))
+    report("Go to File (500,000 paths)", rows)
+
+
+@benchmark("startup")
+def bench_startup():
+    # Launch the editor as a fresh process and time the first keystroke it handles
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    launches = 5
+    timings = []
+    with tempfile.TemporaryDirectory() as home:
+        # A private home keeps recovery prompts from other sessions out of the way
+        env = dict(os.environ, TURTLEIDE_STARTUP_PROBE="1", HOME=home, USERPROFILE=home)
+        for i in range(launches):
+            start = time.time()
+            try:
+                result = subprocess.run([sys.executable, script], env=env, capture_output=True,
+                                        text=True, timeout=30)
+            except subprocess.TimeoutExpired:
+                report("Startup", [("skipped", "the window never handled the keystroke")])
+                return
+            lines = result.stdout.strip().splitlines()
+            if result.returncode or not lines:
+                error = (result.stderr.strip().splitlines() or ["no output"])[-1]
+                report("Startup", [("skipped", error)])
+                return
+            probe = json.loads(lines[-1])
+            timings.append({name: (value - start) * 1000 for name, value in probe.items()})
+    
+    rows = []
+    for name, label in (("main", "interpreter + imports"), ("shown", "window visible"),
+                        ("typed", "first keystroke handled")):
+        values = sorted(timing[name] for timing in timings)
+        record(f"startup/{label}", values[len(values) // 2], 'ms')
+        rows.append((label, f"{values[len(values) // 2]:9.1f} ms  (best {values[0]:.1f} ms)"))
+    report(f"Startup (median of {launches} launches)", rows)
+
+
+@benchmark("warm-run")
+def bench_warm_run():
+    # F5 latency of a script with heavy imports, cold against a warm interpreter
+    modules = ["asyncio", "email.mime.multipart", "http.server", "xml.dom.minidom", "unittest", "decimal"]
+    runs = 5
+    with tempfile.TemporaryDirectory() as directory:
+        script = os.path.join(directory, "script.py")
+        with open(script, 'w', encoding='utf-8') as file:
+            file.write("".join(f"import {name}\n" for name in modules) + "print('done')\n")
+        request = {'script': script, 'cwd': directory, 'args': []}
+        
+        def run(worker):
+            runner = ide.ProcessRunner([sys.executable, script], worker=worker, request=request)
+            start = time.perf_counter()
+            runner.start()
+            while not runner.poll():
+                runner.drain()
+                time.sleep(0.001)
+            return time.perf_counter() - start
+        
+        cold = [run(None) for i in range(runs)]
+        pool = ide.WarmPool(sys.executable, modules)
+        warm = []
+        try:
+            for i in range(runs):
+                # Give the pool time to refill, as between two F5 presses
+                pool.fill()
+                deadline = time.perf_counter() + 10
+                while len(pool.workers) < pool.size and time.perf_counter() < deadline:
+                    time.sleep(0.01)
+                time.sleep(0.5)
+                warm.append(run(pool.take()))
+        finally:
+            pool.close()
+    
+    rows = []
+    for label, samples in (("cold start", cold), ("warm interpreter", warm)):
+        median = sorted(samples)[len(samples) // 2] * 1000
+        record(f"warm-run/{label}", median, 'ms')
+        rows.append((label, f"{median:9.1f} ms median of {runs}"))
+    report(f"Run a script importing {len(modules)} stdlib packages", rows)
+
+
+def pump(root, done, timeout=600):
+    # Run the event loop until done() is true, leaving the GIL to worker threads
+    deadline = time.perf_counter() + timeout
+    while not done():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("the editor did not settle")
+        root.update()
+        time.sleep(0.0005)
+
+
+def interaction(root, editor, action, count):
+    # Durations of an action plus the redraw work it schedules, one per repeat
+    samples = []
+    for i in range(count):
+        start = time.perf_counter()
+        action(i)
+        editor.scheduler.flush()
+        root.update_idletasks()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_editor_file(root, editor, directory, ext, line_count, rows):
+    # Open, highlight, type, scroll, find, save and zoom one generated file
+    path = os.path.join(directory, f"sample_{line_count}{ext}")
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write("\n".join(generate_source(ext, line_count)))
+    key = f"editor/{ext} {line_count} lines"
+    label = f"{ext:<5}{line_count:>9,}"
+    memory = rss_mb()
+    
+    def timed(name, run, done=lambda: True):
+        start = time.perf_counter()
+        run()
+        pump(root, done)
+        elapsed = (time.perf_counter() - start) * 1000
+        record(f"{key} {name}", elapsed, 'ms')
+        rows.append((f"{label} {name}", f"{elapsed:9.1f} ms"))
+    
+    def spread(name, samples):
+        p50, p90, p99, worst = (value * 1000 for value in percentiles(samples))
+        record(f"{key} {name} p50", p50, 'ms')
+        record(f"{key} {name} p99", p99, 'ms')
+        rows.append((f"{label} {name}", f"{p50:9.2f} ms p50  {p90:.2f} p90  {p99:.2f} p99  {worst:.2f} max"))
+    
+    timed("open", lambda: editor.open_specific_file(path), lambda: editor.file_loader is None)
+    text = editor.text_editor
+    timed("full highlight", editor.apply_syntax_highlighting,
+          lambda: editor.highlight_job is None and not editor.scheduler.dirty)
+    if memory is not None:
+        # Memory the process already holds is reused, so this only sees growth
+        grown = max(0.0, rss_mb() - memory)
+        record(f"{key} memory", grown, 'MB')
+        rows.append((f"{label} memory", f"{grown:9.1f} MB after open and highlight"))
+    
+    # A burst of typing in the middle of the file
+    text.mark_set(tk.INSERT, f"{line_count // 2}.0")
+    text.see(tk.INSERT)
+    spread("typing", interaction(root, editor, lambda i: text.insert(tk.INSERT, "x"), 200))
+
+    # Backspace at column 0 and Delete at the end of a line, sent the way Tk's
+    # bindings send them: one index, whose following character is the newline
+    def join_lines(i):
+        line = line_count // 2 - i
+        text.mark_set(tk.INSERT, f"{line}.0" if i % 2 else f"{line}.end")
+        text.delete("insert-1c" if i % 2 else tk.INSERT)
+    spread("join lines", interaction(root, editor, join_lines, 100))
+    if editor.rope.text() != text.get("1.0", "end-1c"):
+        raise AssertionError(f"{key}: the rope no longer matches the buffer after joining lines")
+    text.yview_moveto(0)
+    spread("scroll", interaction(root, editor, lambda i: text.yview_scroll(25, 'units'), 100))
+    
+    editor.find_text()
+    editor.search_regex = ide.compile_search("in")
+    timed("find", editor.start_search, lambda: editor.search_job.done)
+    spread("find next", interaction(root, editor, lambda i: editor.find_next(), 100))
+    editor.close_find_dialog()
+    
+    timed("save", lambda: editor.save_file(wait=True))
+    spread("zoom", interaction(root, editor, lambda i: editor.zoom_in() if i < 6 else editor.zoom_out(), 12))
+    editor.reset_zoom()
+    editor.close_document()
+
+
+@benchmark("editor")
+def bench_editor():
+    # A real CodeEditor driven through its own methods, per language and file size
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        report("Editor", [("skipped", f"{e} (try xvfb-run)")])
+        return
+    
+    with tempfile.TemporaryDirectory() as directory:
+        # A private home keeps the editor's recovery journals out of the real one
+        home = os.environ.get('HOME'), os.environ.get('USERPROFILE')
+        os.environ['HOME'] = os.environ['USERPROFILE'] = directory
+        try:
+            editor = ide.CodeEditor(root)
+            root.update()
+            for line_count in OPTIONS['sizes']:
+                rows = []
+                for ext in ide.SYNTAX_PATTERNS:
+                    bench_editor_file(root, editor, directory, ext, line_count, rows)
+                report(f"Editor ({line_count:,} lines)", rows)
+        finally:
+            for name, value in zip(('HOME', 'USERPROFILE'), home):
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+            root.destroy()
+
+
+def compare_with_baseline(save):
+    # Store the results, or flag the ones that got worse than the baseline
+    path = OPTIONS['baseline']
+    baseline = {}
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as file:
+            baseline = json.load(file)
+    
+    if save:
+        baseline.update({key: {'value': value, 'unit': unit} for key, (value, unit) in RESULTS.items()})
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"\nSaved {len(RESULTS)} measurements to {path}")
+        return 0
+    
+    compared = 0
+    rows = []
+    for key, (value, unit) in RESULTS.items():
+        old = baseline.get(key)
+        if old is None or old['unit'] != unit or not old['value'] or not value:
+            continue
+        compared += 1
+        # How much worse, as a fraction of the baseline
+        change = old['value'] / value - 1 if unit.endswith('/s') else value / old['value'] - 1
+        if change > OPTIONS['tolerance']:
+            rows.append(("REGRESSION", f"{key}: {old['value']:.2f} -> {value:.2f} {unit} (+{change:.0%})"))
+    if compared:
+        report(f"Baseline ({compared} measurements, tolerance {OPTIONS['tolerance']:.0%})",
+               rows or [("no regressions", "")])
+    return 1 if rows else 0
+
+
+def main(argv):
+    names = []
+    save = False
+    for arg in argv:
+        option, _, value = arg.partition("=")
+        if option == "--save-baseline":
+            save = True
+        elif option == "--baseline":
+            OPTIONS['baseline'] = value
+        elif option == "--tolerance":
+            OPTIONS['tolerance'] = float(value)
+        elif option == "--sizes":
+            OPTIONS['sizes'] = tuple(int(size) for size in value.split(","))
+        elif arg.startswith("--"):
+            print(f"Unknown option: {arg}")
+            return 1
+        else:
+            names.append(arg)
+    
+    for name in names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark: {name} (choose from {', '.join(BENCHMARKS)})")
+            return 1
+    for name in names or list(BENCHMARKS):
+        BENCHMARKS[name]()
+    return compare_with_baseline(save)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))